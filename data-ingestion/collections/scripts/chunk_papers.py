@@ -3,29 +3,35 @@ Chunking Strategies for Research Papers
 Implements multiple chunking approaches for optimal RAG performance.
 """
 
-import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import re
+from multiprocessing import Pool, cpu_count
 
-from langchain.text_splitter import (
-    RecursiveCharacterTextSplitter,
-    TokenTextSplitter
-)
+import orjson
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/chunking.log'),
-        logging.StreamHandler()
-    ]
-)
+# Log file for this step. Logging is configured by _configure_logging() when the
+# script runs, so importing the module (as run_pipeline.py does) opens no handlers.
+LOG_FILE = 'logs/chunking.log'
 logger = logging.getLogger(__name__)
 
+
+def _configure_logging():
+    """Send log records to this step's log file and the console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+
 # Paths
 TEXT_DIR = Path("raw_data/arxiv/text")
 METADATA_DIR = Path("raw_data/arxiv/metadata")
@@ -44,6 +50,15 @@ SECTION_HEADERS = [
     r'\b(?:References|Bibliography)\b'
 ]
 
+# All section headers as one alternation, compiled once and scanned in a single pass
+SECTION_RE = re.compile(
+    "|".join(f"(?P<s{i}>{pattern})" for i, pattern in enumerate(SECTION_HEADERS)),
+    re.IGNORECASE
+)
+
+# Tokenizer for token-based chunking, loaded once per process
+TOKEN_ENCODING = tiktoken.get_encoding("gpt2")
+
 
 class PaperChunker:
     """Implements multiple chunking strategies for research papers."""
@@ -57,6 +72,23 @@ class PaperChunker:
             'section_chunks': 0,
             'hybrid_chunks': 0
         }
+        
+        # Splitters are built once and reused for every paper
+        self.recursive_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
+        self.section_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200
+        )
+        self.hybrid_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=800,
+            chunk_overlap=150,
+            separators=["\n\n", "\n", ". ", " ", ""]
+        )
     
     def chunk_recursive(self, text: str, metadata: Dict) -> List[Document]:
         """
@@ -69,14 +101,7 @@ class PaperChunker:
         Returns:
             List of Document objects
         """
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
-        
-        chunks = splitter.split_text(text)
+        chunks = self.recursive_splitter.split_text(text)
         
         documents = []
         for i, chunk in enumerate(chunks):
@@ -105,12 +130,18 @@ class PaperChunker:
         Returns:
             List of Document objects
         """
-        splitter = TokenTextSplitter(
-            chunk_size=512,
-            chunk_overlap=50
-        )
+        chunk_size = 512
+        chunk_overlap = 50
+        
+        # Encode once and slice overlapping windows out of the token stream
+        # (same encoding and windows as LangChain's TokenTextSplitter)
+        token_ids = TOKEN_ENCODING.encode_ordinary(text)
         
-        chunks = splitter.split_text(text)
+        windows = [
+            token_ids[start:start + chunk_size]
+            for start in range(0, max(len(token_ids) - chunk_overlap, 1), chunk_size - chunk_overlap)
+        ] if token_ids else []
+        chunks = TOKEN_ENCODING.decode_batch(windows)
         
         documents = []
         for i, chunk in enumerate(chunks):
@@ -129,28 +160,31 @@ class PaperChunker:
         self.stats['token_chunks'] += len(documents)
         return documents
     
-    def chunk_by_sections(self, text: str, metadata: Dict) -> List[Document]:
+    def chunk_by_sections(
+        self,
+        text: str,
+        metadata: Dict,
+        sections: Optional[List[Tuple[str, str]]] = None
+    ) -> List[Document]:
         """
         Section-based chunking for structured papers.
         
         Args:
             text: Full paper text
             metadata: Paper metadata
+            sections: Sections from _extract_sections, extracted from text if omitted
             
         Returns:
             List of Document objects
         """
-        sections = self._extract_sections(text)
+        if sections is None:
+            sections = self._extract_sections(text)
         
         documents = []
         for i, (section_name, section_text) in enumerate(sections):
             # Further split large sections
             if len(section_text) > 2000:
-                subsplitter = RecursiveCharacterTextSplitter(
-                    chunk_size=1000,
-                    chunk_overlap=200
-                )
-                subchunks = subsplitter.split_text(section_text)
+                subchunks = self.section_splitter.split_text(section_text)
                 
                 for j, subchunk in enumerate(subchunks):
                     doc = Document(
@@ -180,18 +214,25 @@ class PaperChunker:
         self.stats['section_chunks'] += len(documents)
         return documents
     
-    def chunk_hybrid(self, text: str, metadata: Dict) -> List[Document]:
+    def chunk_hybrid(
+        self,
+        text: str,
+        metadata: Dict,
+        sections: Optional[List[Tuple[str, str]]] = None
+    ) -> List[Document]:
         """
         Hybrid approach: section-aware + semantic splits.
         
         Args:
             text: Full paper text
             metadata: Paper metadata
+            sections: Sections from _extract_sections, extracted from text if omitted
             
         Returns:
             List of Document objects
         """
-        sections = self._extract_sections(text)
+        if sections is None:
+            sections = self._extract_sections(text)
         
         documents = []
         chunk_id = 0
@@ -218,13 +259,7 @@ class PaperChunker:
                 chunk_id += 1
             else:
                 # Smart splitting for larger sections
-                splitter = RecursiveCharacterTextSplitter(
-                    chunk_size=800,
-                    chunk_overlap=150,
-                    separators=["\n\n", "\n", ". ", " ", ""]
-                )
-                
-                chunks = splitter.split_text(section_text)
+                chunks = self.hybrid_splitter.split_text(section_text)
                 
                 for chunk in chunks:
                     doc = Document(
@@ -256,14 +291,10 @@ class PaperChunker:
         sections = []
         section_positions = []
         
-        # Find all section headers
-        for pattern in SECTION_HEADERS:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                section_name = match.group(0).strip()
-                section_positions.append((match.start(), section_name))
-        
-        # Sort by position
-        section_positions.sort()
+        # Find all section headers (matches come back in position order)
+        for match in SECTION_RE.finditer(text):
+            section_name = match.group(0).strip()
+            section_positions.append((match.start(), section_name))
         
         # Extract text between sections
         for i, (start_pos, section_name) in enumerate(section_positions):
@@ -272,10 +303,8 @@ class PaperChunker:
             else:
                 end_pos = len(text)
             
-            section_text = text[start_pos:end_pos].strip()
-            
-            # Remove the header from text
-            section_text = re.sub(section_name, '', section_text, count=1).strip()
+            # Skip past the header itself
+            section_text = text[start_pos + len(section_name):end_pos].strip()
             
             if section_text:
                 sections.append((section_name, section_text))
@@ -300,8 +329,7 @@ class PaperChunker:
             with open(text_path, 'r', encoding='utf-8') as f:
                 text = f.read()
             
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            metadata = orjson.loads(metadata_path.read_bytes())
             
             logger.info(f"Chunking paper: {arxiv_id}")
             
@@ -320,12 +348,15 @@ class PaperChunker:
             token_docs = self.chunk_token_based(text, base_metadata)
             self._save_chunks(token_docs, 'token_based', arxiv_id)
             
+            # Sections are extracted once and shared by both section-aware strategies
+            sections = self._extract_sections(text)
+            
             # 3. Section-based chunking
-            section_docs = self.chunk_by_sections(text, base_metadata)
+            section_docs = self.chunk_by_sections(text, base_metadata, sections)
             self._save_chunks(section_docs, 'section_based', arxiv_id)
             
             # 4. Hybrid chunking
-            hybrid_docs = self.chunk_hybrid(text, base_metadata)
+            hybrid_docs = self.chunk_hybrid(text, base_metadata, sections)
             self._save_chunks(hybrid_docs, 'hybrid', arxiv_id)
             
             self.stats['papers_processed'] += 1
@@ -334,24 +365,22 @@ class PaperChunker:
             logger.error(f"Error processing {arxiv_id}: {e}")
     
     def _save_chunks(self, documents: List[Document], strategy: str, arxiv_id: str):
-        """Save chunks to JSON file."""
+        """Save chunks to a JSON Lines file, one chunk per line."""
         output_dir = CHUNKED_BASE / strategy
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        output_file = output_dir / f"{arxiv_id}.json"
+        output_file = output_dir / f"{arxiv_id}.jsonl"
         
-        chunks_data = [
-            {
-                'content': doc.page_content,
-                'metadata': doc.metadata
-            }
-            for doc in documents
-        ]
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks_data, f, indent=2)
+        # Stream chunks out one at a time rather than building the whole list
+        with open(output_file, 'wb') as f:
+            for doc in documents:
+                f.write(orjson.dumps({
+                    'content': doc.page_content,
+                    'metadata': doc.metadata
+                }))
+                f.write(b"\n")
     
-    def process_all_papers(self):
+    def process_all_papers(self, parallel: bool = True):
         """Process all papers with all chunking strategies."""
         logger.info("="*80)
         logger.info("Starting Paper Chunking")
@@ -361,9 +390,21 @@ class PaperChunker:
         text_files = list(TEXT_DIR.glob("*.txt"))
         logger.info(f"Found {len(text_files)} papers to chunk")
         
-        for text_file in text_files:
-            arxiv_id = text_file.stem
-            self.process_paper(arxiv_id)
+        arxiv_ids = [text_file.stem for text_file in text_files]
+        
+        if parallel and len(arxiv_ids) > 10:
+            # Parallel processing
+            num_workers = min(cpu_count(), 8)
+            logger.info(f"Using {num_workers} parallel workers")
+            
+            with Pool(num_workers, initializer=_init_worker) as pool:
+                for paper_stats in pool.imap_unordered(_chunk_paper, arxiv_ids, chunksize=4):
+                    for key, value in paper_stats.items():
+                        self.stats[key] += value
+        else:
+            # Sequential processing
+            for arxiv_id in arxiv_ids:
+                self.process_paper(arxiv_id)
         
         self._print_summary()
     
@@ -381,17 +422,37 @@ class PaperChunker:
         
         # Save summary
         summary_path = Path("logs/chunking_summary.json")
-        with open(summary_path, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+        summary_path.write_bytes(orjson.dumps(self.stats, option=orjson.OPT_INDENT_2))
+
+
+# Chunker owned by each worker process, created once by _init_worker
+_worker_chunker = None
+
+
+def _init_worker():
+    """Create the chunker reused for every paper in this worker."""
+    global _worker_chunker
+    # Spawned workers do not inherit the parent's logging setup
+    if not logging.getLogger().handlers:
+        _configure_logging()
+    _worker_chunker = PaperChunker()
+
+
+def _chunk_paper(arxiv_id: str) -> Dict[str, int]:
+    """Chunk a single paper in a worker and return its stats."""
+    _worker_chunker.stats = dict.fromkeys(_worker_chunker.stats, 0)
+    _worker_chunker.process_paper(arxiv_id)
+    return _worker_chunker.stats
 
 
 def main():
     """Main entry point."""
     chunker = PaperChunker()
-    chunker.process_all_papers()
+    chunker.process_all_papers(parallel=True)
     
     logger.info("\n✅ Chunking complete! Check logs/chunking_summary.json for details.")
 
 
 if __name__ == "__main__":
+    _configure_logging()
     main()
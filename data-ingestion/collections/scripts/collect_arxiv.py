@@ -6,23 +6,30 @@ Collects 100 technical research papers from ArXiv across multiple CS/ML categori
 import arxiv
 import os
 import json
-import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from pathlib import Path
 import logging
 from typing import List, Dict
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/collection.log'),
-        logging.StreamHandler()
-    ]
-)
+# Log file for this step. Logging is configured by _configure_logging() when the
+# script runs, so importing the module (as run_pipeline.py does) opens no handlers.
+LOG_FILE = 'logs/collection.log'
 logger = logging.getLogger(__name__)
 
+
+def _configure_logging():
+    """Send log records to this step's log file and the console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+
 # Configuration
 CATEGORIES = {
     'cs.AI': 30,       # Artificial Intelligence
@@ -41,11 +48,16 @@ METADATA_DIR = BASE_DIR / "metadata"
 START_DATE = "2023-01-01"
 MIN_PAGES = 5
 
+# Rate limiting: the ArXiv API allows 1 request per 3 seconds; PDF downloads
+# are served separately and run concurrently
+API_DELAY_SECONDS = 3.0
+DOWNLOAD_WORKERS = 4
+
 class ArXivCollector:
     """Collects papers from ArXiv with rate limiting and error handling."""
     
     def __init__(self):
-        self.client = arxiv.Client()
+        self.client = arxiv.Client(delay_seconds=API_DELAY_SECONDS)
         self.collected_ids = set()
         self.stats = {
             'total_collected': 0,
@@ -91,77 +103,109 @@ class ArXivCollector:
         )
         
         papers = []
-        collected_count = 0
+        pending = {}
         
-        for result in self.client.results(search):
-            # Check if already collected
-            arxiv_id = result.entry_id.split('/abs/')[-1]
-            
-            if arxiv_id in self.collected_ids:
-                self.stats['duplicates'] += 1
-                continue
-            
-            # Quality filters
-            if result.published.strftime('%Y-%m-%d') < START_DATE:
-                continue
-            
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
             try:
-                # Download PDF
-                pdf_filename = f"{arxiv_id.replace('/', '_')}.pdf"
-                pdf_path = PDF_DIR / category / pdf_filename
-                pdf_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                logger.info(f"Downloading: {result.title[:50]}...")
-                result.download_pdf(dirpath=str(pdf_path.parent), filename=pdf_filename)
-                
-                # Create metadata
-                metadata = {
-                    'arxiv_id': arxiv_id,
-                    'title': result.title,
-                    'authors': [author.name for author in result.authors],
-                    'abstract': result.summary,
-                    'categories': result.categories,
-                    'primary_category': result.primary_category,
-                    'published': result.published.strftime('%Y-%m-%d'),
-                    'updated': result.updated.strftime('%Y-%m-%d'),
-                    'doi': result.doi,
-                    'pdf_url': result.pdf_url,
-                    'comment': result.comment,
-                    'journal_ref': result.journal_ref,
-                    'file_path': str(pdf_path),
-                    'download_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                
-                # Save metadata
-                metadata_path = METADATA_DIR / f"{arxiv_id.replace('/', '_')}.json"
-                metadata_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(metadata_path, 'w') as f:
-                    json.dump(metadata, f, indent=2)
-                
-                papers.append(metadata)
-                self.collected_ids.add(arxiv_id)
-                collected_count += 1
-                
-                self.stats['total_collected'] += 1
-                self.stats['by_category'][category] += 1
-                
-                logger.info(f"✓ Collected {collected_count}/{max_results} from {category}")
-                
-                # Rate limiting: 1 request per 3 seconds
-                time.sleep(3)
-                
-                if collected_count >= max_results:
-                    break
+                for result in self.client.results(search):
+                    # Check if already collected
+                    arxiv_id = result.entry_id.split('/abs/')[-1]
                     
-            except Exception as e:
-                logger.error(f"Failed to download {arxiv_id}: {e}")
-                self.stats['failed'] += 1
-                continue
+                    if arxiv_id in self.collected_ids:
+                        self.stats['duplicates'] += 1
+                        continue
+                    
+                    # Quality filters
+                    if result.published.strftime('%Y-%m-%d') < START_DATE:
+                        continue
+                    
+                    logger.info(f"Downloading: {result.title[:50]}...")
+                    future = executor.submit(self._download_paper, result, arxiv_id, category)
+                    pending[future] = arxiv_id
+                    
+                    # Only keep enough downloads in flight to reach the target
+                    while pending and len(papers) + len(pending) >= max_results:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for finished in done:
+                            self._record_download(finished, pending.pop(finished), category, max_results, papers)
+                    
+                    if len(papers) >= max_results:
+                        break
+            finally:
+                # Record every download that was started, even if the search
+                # failed part way, so finished papers count as collected
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        self._record_download(finished, pending.pop(finished), category, max_results, papers)
         
+        collected_count = len(papers)
         logger.info(f"Completed {category}: collected {collected_count} papers")
         return papers
     
+    def _download_paper(self, result: arxiv.Result, arxiv_id: str, category: str) -> Dict:
+        """
+        Download a paper's PDF and save its metadata.
+        
+        Args:
+            result: ArXiv search result
+            arxiv_id: ArXiv paper ID
+            category: ArXiv category the paper was collected under
+            
+        Returns:
+            Paper metadata dictionary
+        """
+        # Download PDF
+        pdf_filename = f"{arxiv_id.replace('/', '_')}.pdf"
+        pdf_path = PDF_DIR / category / pdf_filename
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        result.download_pdf(dirpath=str(pdf_path.parent), filename=pdf_filename)
+        
+        # Create metadata
+        metadata = {
+            'arxiv_id': arxiv_id,
+            'title': result.title,
+            'authors': [author.name for author in result.authors],
+            'abstract': result.summary,
+            'categories': result.categories,
+            'primary_category': result.primary_category,
+            'published': result.published.strftime('%Y-%m-%d'),
+            'updated': result.updated.strftime('%Y-%m-%d'),
+            'doi': result.doi,
+            'pdf_url': result.pdf_url,
+            'comment': result.comment,
+            'journal_ref': result.journal_ref,
+            'file_path': str(pdf_path),
+            'download_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        # Save metadata
+        metadata_path = METADATA_DIR / f"{arxiv_id.replace('/', '_')}.json"
+        metadata_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        
+        return metadata
+    
+    def _record_download(self, future, arxiv_id: str, category: str, max_results: int, papers: List[Dict]):
+        """Record the outcome of a finished download."""
+        try:
+            metadata = future.result()
+        except Exception as e:
+            logger.error(f"Failed to download {arxiv_id}: {e}")
+            self.stats['failed'] += 1
+            return
+        
+        papers.append(metadata)
+        self.collected_ids.add(arxiv_id)
+        
+        self.stats['total_collected'] += 1
+        self.stats['by_category'][category] += 1
+        
+        logger.info(f"✓ Collected {len(papers)}/{max_results} from {category}")
+    
     def collect_all(self):
         """Collect papers from all configured categories."""
         logger.info("="*80)
@@ -213,4 +257,5 @@ def main():
 
 
 if __name__ == "__main__":
+    _configure_logging()
     main()
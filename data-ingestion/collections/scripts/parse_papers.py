@@ -4,28 +4,41 @@ Extracts text from ArXiv PDFs and identifies paper structure.
 """
 
 import fitz  # PyMuPDF
-import json
 import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import re
 from multiprocessing import Pool, cpu_count
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/processing.log'),
-        logging.StreamHandler()
-    ]
-)
+import orjson
+
+# Log file for this step. Logging is configured by _configure_logging() when the
+# script runs, so importing the module (as run_pipeline.py does) opens no handlers.
+LOG_FILE = 'logs/processing.log'
 logger = logging.getLogger(__name__)
 
+
+def _configure_logging():
+    """Send log records to this step's log file and the console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+
 # Paths
 PDF_BASE = Path("raw_data/arxiv/pdfs")
 TEXT_DIR = Path("raw_data/arxiv/text")
-METADATA_DIR = Path("raw_data/arxiv/metadata")
+PARSED_DIR = Path("raw_data/arxiv/parsed")
+
+# Plain-text extraction flags: PyMuPDF's text defaults, but with ligatures
+# expanded (e.g. "ﬁ" -> "fi") so section patterns and search match them
+TEXT_FLAGS = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_LIGATURES
 
 # Section headers to identify (case-insensitive)
 SECTION_PATTERNS = {
@@ -40,6 +53,42 @@ SECTION_PATTERNS = {
     'references': r'\b(?:References|Bibliography)\b'
 }
 
+# Sections whose header can sit inside another section's header ("Results" in
+# "Experimental Results"). A shared alternation would consume them, so each is
+# searched for on its own.
+NESTED_SECTIONS = ('results',)
+
+# Lowercase words that must appear in the text for each section pattern to match
+SECTION_KEYWORDS = {
+    'abstract': ['abstract'],
+    'introduction': ['introduction'],
+    'related_work': ['related'],
+    'methodology': ['methodology', 'methods', 'approach'],
+    'experiments': ['experiments', 'experimental'],
+    'results': ['results'],
+    'discussion': ['discussion'],
+    'conclusion': ['conclusion'],
+    'references': ['references', 'bibliography']
+}
+
+
+@lru_cache(maxsize=None)
+def _section_regex(section_names: Tuple[str, ...], ignore_case: bool) -> re.Pattern:
+    """
+    Compile the section alternation restricted to the given sections.
+    
+    Without ignore_case the patterns are lowercased and matched case-sensitively,
+    so they must be run on lowercased text.
+    """
+    if ignore_case:
+        return re.compile(
+            "|".join(f"(?P<{name}>{SECTION_PATTERNS[name]})" for name in section_names),
+            re.IGNORECASE
+        )
+    return re.compile(
+        "|".join(f"(?P<{name}>{SECTION_PATTERNS[name].lower()})" for name in section_names)
+    )
+
 
 class PDFParser:
     """Extract text and structure from research papers."""
@@ -64,34 +113,35 @@ class PDFParser:
             Dictionary containing extracted text and metadata, or None if failed
         """
         try:
-            doc = fitz.open(pdf_path)
-            
-            # Extract text from all pages
-            full_text = ""
-            page_texts = []
+            # Close the document as soon as its pages and outline are read,
+            # including when extraction fails part way through
+            with fitz.open(pdf_path) as doc:
+                page_texts = [page.get_text("text", flags=TEXT_FLAGS, sort=False) for page in doc]
+                sections = self._sections_from_outline(doc, page_texts)
+                num_pages = len(doc)
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                page_texts.append(text)
-                full_text += text + "\n\n"
+            # Join page texts once
+            full_text = "".join(f"{text}\n\n" for text in page_texts)
             
-            # Identify sections
-            sections = self._identify_sections(full_text)
+            # Identify sections, preferring the PDF's own outline over a text scan
+            if sections:
+                # Outlines often skip the abstract and unnumbered headings such as
+                # References, so fill those in from a scan of the full text
+                for section_name, position in self._identify_sections(full_text).items():
+                    sections.setdefault(section_name, position)
+                sections = {name: sections[name] for name in SECTION_PATTERNS if name in sections}
+            else:
+                sections = self._identify_sections(full_text)
             
             # Extract metadata
-            num_pages = len(doc)
             file_size = pdf_path.stat().st_size
             
-            doc.close()
-            
             return {
                 'file_path': str(pdf_path),
                 'num_pages': num_pages,
                 'file_size_bytes': file_size,
                 'text_length': len(full_text),
                 'full_text': full_text,
-                'page_texts': page_texts,
                 'sections': sections,
                 'extraction_success': True
             }
@@ -100,6 +150,43 @@ class PDFParser:
             logger.error(f"Failed to extract from {pdf_path}: {e}")
             return None
     
+    def _sections_from_outline(self, doc: fitz.Document, page_texts: List[str]) -> Dict[str, int]:
+        """
+        Identify section positions from the PDF outline (bookmarks).
+        
+        Args:
+            doc: Open PDF document
+            page_texts: Extracted text of each page
+            
+        Returns:
+            Dictionary mapping section names to character positions,
+            empty if the PDF has no usable outline
+        """
+        sections = {}
+        
+        # Start of each page in the joined full text
+        page_offsets = []
+        offset = 0
+        for text in page_texts:
+            page_offsets.append(offset)
+            offset += len(text) + 2
+        
+        for _level, title, page_num in doc.get_toc():
+            if not 1 <= page_num <= len(page_texts):
+                continue
+            
+            page_text = page_texts[page_num - 1]
+            for section_name in self._identify_sections(title):
+                if section_name in sections:
+                    continue
+                
+                # Locate the heading on its page, falling back to the top of the page
+                match = _section_regex((section_name,), True).search(page_text)
+                position = match.start() if match else 0
+                sections[section_name] = page_offsets[page_num - 1] + position
+        
+        return sections
+    
     def _identify_sections(self, text: str) -> Dict[str, int]:
         """
         Identify approximate positions of paper sections.
@@ -112,12 +199,42 @@ class PDFParser:
         """
         sections = {}
         
-        for section_name, pattern in SECTION_PATTERNS.items():
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                sections[section_name] = match.start()
+        # Prescreen with plain substring checks and drop sections that cannot match
+        lower_text = text.lower()
+        candidates = tuple(
+            name for name, keywords in SECTION_KEYWORDS.items()
+            if any(keyword in lower_text for keyword in keywords)
+        )
+        if not candidates:
+            return sections
         
-        return sections
+        # Scan the lowercased text case-sensitively, which is cheaper than
+        # IGNORECASE; positions only carry over if lowercasing kept the length
+        if len(lower_text) == len(text):
+            scan_text, ignore_case = lower_text, False
+        else:
+            scan_text, ignore_case = text, True
+        
+        for section_name in candidates:
+            if section_name in NESTED_SECTIONS:
+                match = _section_regex((section_name,), ignore_case).search(scan_text)
+                if match:
+                    sections[section_name] = match.start()
+        
+        # Single pass over the rest: keep the first occurrence of each section,
+        # stopping once every one of them has been seen
+        shared = tuple(name for name in candidates if name not in NESTED_SECTIONS)
+        if shared:
+            remaining = len(shared)
+            for match in _section_regex(shared, ignore_case).finditer(scan_text):
+                if match.lastgroup not in sections:
+                    sections[match.lastgroup] = match.start()
+                    remaining -= 1
+                    if not remaining:
+                        break
+        
+        # Report sections in pattern order, independent of where they occur
+        return {name: sections[name] for name in SECTION_PATTERNS if name in sections}
     
     def extract_section_text(self, full_text: str, sections: Dict[str, int]) -> Dict[str, str]:
         """
@@ -148,12 +265,7 @@ class PDFParser:
         """Process a single paper PDF."""
         try:
             arxiv_id = pdf_path.stem
-            
-            # Check if already processed
             text_path = TEXT_DIR / f"{arxiv_id}.txt"
-            if text_path.exists():
-                logger.debug(f"Already processed: {arxiv_id}")
-                return True
             
             logger.info(f"Processing: {arxiv_id}")
             
@@ -169,23 +281,18 @@ class PDFParser:
             with open(text_path, 'w', encoding='utf-8') as f:
                 f.write(result['full_text'])
             
-            # Update metadata
-            metadata_path = METADATA_DIR / f"{arxiv_id}.json"
-            if metadata_path.exists():
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
-                
-                metadata.update({
-                    'text_path': str(text_path),
-                    'num_pages': result['num_pages'],
-                    'file_size_bytes': result['file_size_bytes'],
-                    'text_length': result['text_length'],
-                    'sections_found': list(result['sections'].keys()),
-                    'extraction_success': True
-                })
-                
-                with open(metadata_path, 'w') as f:
-                    json.dump(metadata, f, indent=2)
+            # Save parse results next to (not into) the collected metadata,
+            # so the metadata file is never read back and rewritten
+            parsed_path = PARSED_DIR / f"{arxiv_id}.json"
+            parsed_path.parent.mkdir(parents=True, exist_ok=True)
+            parsed_path.write_bytes(orjson.dumps({
+                'text_path': str(text_path),
+                'num_pages': result['num_pages'],
+                'file_size_bytes': result['file_size_bytes'],
+                'text_length': result['text_length'],
+                'sections_found': list(result['sections'].keys()),
+                'extraction_success': True
+            }, option=orjson.OPT_INDENT_2))
             
             self.stats['successful'] += 1
             self.stats['total_processed'] += 1
@@ -209,19 +316,25 @@ class PDFParser:
             if category_dir.is_dir():
                 pdf_files.extend(category_dir.glob("*.pdf"))
         
-        logger.info(f"Found {len(pdf_files)} PDF files to process")
+        # Skip papers already processed, with one directory scan
+        processed_ids = {text_path.stem for text_path in TEXT_DIR.glob("*.txt")}
+        num_found = len(pdf_files)
+        pdf_files = [pdf_path for pdf_path in pdf_files if pdf_path.stem not in processed_ids]
+        
+        logger.info(f"Found {num_found} PDF files, {len(pdf_files)} not yet processed")
         
         if parallel and len(pdf_files) > 10:
             # Parallel processing
             num_workers = min(cpu_count(), 8)
             logger.info(f"Using {num_workers} parallel workers")
             
-            with Pool(num_workers) as pool:
-                results = pool.map(self.process_single_paper, pdf_files)
-            
-            self.stats['successful'] = sum(results)
-            self.stats['failed'] = len(results) - sum(results)
-            self.stats['total_processed'] = len(results)
+            with Pool(num_workers, initializer=_init_worker) as pool:
+                for success in pool.imap_unordered(_parse_paper, pdf_files, chunksize=4):
+                    self.stats['total_processed'] += 1
+                    if success:
+                        self.stats['successful'] += 1
+                    else:
+                        self.stats['failed'] += 1
         else:
             # Sequential processing
             for pdf_path in pdf_files:
@@ -246,8 +359,25 @@ class PDFParser:
         
         # Save summary
         summary_path = Path("logs/processing_summary.json")
-        with open(summary_path, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+        summary_path.write_bytes(orjson.dumps(self.stats, option=orjson.OPT_INDENT_2))
+
+
+# Parser owned by each worker process, created once by _init_worker
+_worker_parser = None
+
+
+def _init_worker():
+    """Create the parser reused for every paper in this worker."""
+    global _worker_parser
+    # Spawned workers do not inherit the parent's logging setup
+    if not logging.getLogger().handlers:
+        _configure_logging()
+    _worker_parser = PDFParser()
+
+
+def _parse_paper(pdf_path: Path) -> bool:
+    """Process a single paper in a worker."""
+    return _worker_parser.process_single_paper(pdf_path)
 
 
 def main():
@@ -261,4 +391,5 @@ def main():
 
 
 if __name__ == "__main__":
+    _configure_logging()
     main()
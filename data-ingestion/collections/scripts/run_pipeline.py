@@ -4,14 +4,23 @@ Orchestrates the entire data collection and processing pipeline.
 """
 
 import sys
+import argparse
+import importlib
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import IO, Optional
 import subprocess
 
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
         logging.FileHandler('logs/pipeline.log'),
         logging.StreamHandler()
@@ -19,6 +28,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of trailing stderr lines repeated when a step fails
+ERROR_TAIL_LINES = 20
+
+
+def _forward_output(stream: IO[str], script_name: str, tail: Optional[deque] = None):
+    """Log each line of a child process stream as it arrives."""
+    for line in stream:
+        line = line.rstrip()
+        logger.info(f"[{script_name}] {line}")
+        if tail is not None:
+            tail.append(line)
+
 
 def run_script(script_name: str, description: str) -> bool:
     """
@@ -42,18 +63,35 @@ def run_script(script_name: str, description: str) -> bool:
         return False
     
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             [sys.executable, str(script_path)],
-            capture_output=True,
-            text=True
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
         )
         
-        if result.returncode == 0:
+        # Stream both pipes line by line, keeping only the end of stderr
+        stderr_tail = deque(maxlen=ERROR_TAIL_LINES)
+        readers = [
+            threading.Thread(target=_forward_output, args=(process.stdout, script_name)),
+            threading.Thread(target=_forward_output, args=(process.stderr, script_name, stderr_tail))
+        ]
+        for reader in readers:
+            reader.start()
+        
+        returncode = process.wait()
+        for reader in readers:
+            reader.join()
+        
+        if returncode == 0:
             logger.info(f"✅ {description} completed successfully")
             return True
         else:
             logger.error(f"❌ {description} failed")
-            logger.error(f"Error output: {result.stderr}")
+            logger.error("Error output:\n" + "\n".join(stderr_tail))
             return False
     
     except Exception as e:
@@ -61,31 +99,96 @@ def run_script(script_name: str, description: str) -> bool:
         return False
 
 
-def main():
-    """Main pipeline execution."""
+def run_step(script_name: str, description: str) -> bool:
+    """
+    Run a pipeline script's main() in this interpreter and return success status.
+    
+    Args:
+        script_name: Name of the script file
+        description: Human-readable description
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    logger.info("="*80)
+    logger.info(f"Step: {description}")
+    logger.info("="*80)
+    
+    start = time.perf_counter()
+    file_handler = None
+    try:
+        # The scripts sit next to this file, so they import by module name
+        module = importlib.import_module(Path(script_name).stem)
+        
+        # Keep writing the step's own log file alongside pipeline.log
+        file_handler = logging.FileHandler(module.LOG_FILE)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        module.logger.addHandler(file_handler)
+        
+        module.main()
+    except Exception:
+        logger.exception(f"❌ {description} failed")
+        return False
+    finally:
+        if file_handler is not None:
+            module.logger.removeHandler(file_handler)
+            file_handler.close()
+    
+    logger.info(f"✅ {description} completed successfully in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+def main(isolated: bool = False):
+    """
+    Main pipeline execution.
+    
+    Args:
+        isolated: Run each step in its own Python subprocess instead of in-process
+    """
     logger.info("\n" + "="*80)
     logger.info("AGENTIC RAG DATA COLLECTION PIPELINE")
     logger.info("Target: 100 ArXiv Research Papers")
     logger.info("="*80 + "\n")
     
-    # Pipeline steps
+    # Pipeline steps and the steps they depend on. Validation only reads the
+    # PDFs, text and metadata, so it runs alongside chunking.
     steps = [
-        ("collect_arxiv.py", "1. Collecting ArXiv Papers"),
-        ("parse_papers.py", "2. Extracting Text from PDFs"),
-        ("chunk_papers.py", "3. Creating Chunks with Multiple Strategies"),
-        ("validate_data.py", "4. Validating Data Quality"),
+        ("collect_arxiv.py", "1. Collecting ArXiv Papers", []),
+        ("parse_papers.py", "2. Extracting Text from PDFs", ["collect_arxiv.py"]),
+        ("chunk_papers.py", "3. Creating Chunks with Multiple Strategies", ["parse_papers.py"]),
+        ("validate_data.py", "4. Validating Data Quality", ["parse_papers.py"]),
     ]
     
-    # Execute pipeline
-    for script, description in steps:
-        success = run_script(script, description)
-        
-        if not success:
-            logger.error(f"\n❌ Pipeline failed at: {description}")
-            logger.error("Please check the logs and fix issues before continuing.")
-            return 1
-        
-        logger.info("")  # Blank line between steps
+    # Execute pipeline in dependency waves. Subprocess steps in a wave run
+    # concurrently; in-process steps run one at a time on this thread, since
+    # their multiprocessing pools fork and must not do so from a process with
+    # other threads running.
+    completed = set()
+    remaining = list(steps)
+    executor = ThreadPoolExecutor(max_workers=len(steps)) if isolated else None
+    
+    try:
+        while remaining:
+            ready = [step for step in remaining if set(step[2]) <= completed]
+            remaining = [step for step in remaining if step not in ready]
+            
+            if executor is not None:
+                futures = [executor.submit(run_script, script, description) for script, description, _ in ready]
+                outcomes = (future.result() for future in futures)
+            else:
+                outcomes = (run_step(script, description) for script, description, _ in ready)
+            
+            for (script, description, _), success in zip(ready, outcomes):
+                if not success:
+                    logger.error(f"\n❌ Pipeline failed at: {description}")
+                    logger.error("Please check the logs and fix issues before continuing.")
+                    return 1
+                completed.add(script)
+            
+            logger.info("")  # Blank line between steps
+    finally:
+        if executor is not None:
+            executor.shutdown()
     
     # Pipeline complete
     logger.info("\n" + "="*80)
@@ -106,4 +209,12 @@ if __name__ == "__main__":
     # Create logs directory if it doesn't exist
     Path("logs").mkdir(exist_ok=True)
     
-    sys.exit(main())
+    parser = argparse.ArgumentParser(description="Run the ArXiv data collection pipeline")
+    parser.add_argument(
+        "--isolated",
+        action="store_true",
+        help="Run each step in a separate Python subprocess"
+    )
+    args = parser.parse_args()
+    
+    sys.exit(main(isolated=args.isolated))
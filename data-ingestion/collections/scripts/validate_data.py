@@ -3,28 +3,72 @@ Data Validation and Quality Checks
 Validates collected papers and provides quality metrics.
 """
 
-import json
 import logging
+import os
+import pickle
 from pathlib import Path
-from typing import Dict, List
-from collections import Counter
+from typing import Dict, List, Tuple
+from collections import Counter, defaultdict
 import hashlib
+from multiprocessing import Pool, cpu_count
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/validation.log'),
-        logging.StreamHandler()
-    ]
-)
+import orjson
+
+# Log file for this step. Logging is configured by _configure_logging() when the
+# script runs, so importing the module (as run_pipeline.py does) opens no handlers.
+LOG_FILE = 'logs/validation.log'
 logger = logging.getLogger(__name__)
 
+
+def _configure_logging():
+    """Send log records to this step's log file and the console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(LOG_FILE),
+            logging.StreamHandler()
+        ]
+    )
+
+
 # Paths
 PDF_BASE = Path("raw_data/arxiv/pdfs")
 TEXT_DIR = Path("raw_data/arxiv/text")
 METADATA_DIR = Path("raw_data/arxiv/metadata")
+PARSED_DIR = Path("raw_data/arxiv/parsed")
+CACHE_PATH = Path("logs/validation_cache.pkl")
+
+# Read size for content hashing in check_duplicates
+HASH_BUFFER_SIZE = 1 << 20  # 1 MiB
+
+# Quality thresholds
+MIN_TEXT_LENGTH = 1000  # characters
+REQUIRED_METADATA_FIELDS = ('arxiv_id', 'title', 'authors', 'abstract', 'primary_category')
+
+# Bump when the shape of cached results or issue messages changes. A cache
+# saved under a different version or different thresholds is discarded.
+CACHE_VERSION = 1
+VALIDATION_RULES = (CACHE_VERSION, MIN_TEXT_LENGTH, REQUIRED_METADATA_FIELDS)
+
+
+def _scan_dir(directory: Path, suffix: str) -> Dict[str, Tuple[int, int]]:
+    """
+    List the files in a directory with the given suffix.
+    
+    Returns:
+        Dictionary mapping file stem to (size in bytes, modification time in ns)
+    """
+    if not directory.is_dir():
+        return {}
+    
+    stats = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(suffix) and entry.is_file():
+                stat = entry.stat()
+                stats[entry.name[:-len(suffix)]] = (stat.st_size, stat.st_mtime_ns)
+    return stats
 
 
 class DataValidator:
@@ -47,8 +91,54 @@ class DataValidator:
         
         self.issues = []
         self.paper_hashes = {}
+        
+        # Running totals for the averages in stats
+        self.total_text_length = 0
+        self.total_file_size = 0
+        
+        # Index every directory once up front, so validating a paper is
+        # lookups instead of exists()/stat() calls per file
+        self.pdf_index = {pdf_path.stem: pdf_path for pdf_path in PDF_BASE.glob("*/*.pdf")}
+        self.text_stats = _scan_dir(TEXT_DIR, '.txt')
+        self.metadata_stats = _scan_dir(METADATA_DIR, '.json')
+        self.parsed_stats = _scan_dir(PARSED_DIR, '.json')
+        
+        # Results from the previous run, reused for files that have not changed
+        self.cache = self._load_cache()
+    
+    def _load_cache(self) -> Dict[str, Dict]:
+        """Load cached validation results and content hashes from the last run."""
+        try:
+            with open(CACHE_PATH, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.get('rules') == VALIDATION_RULES:
+                return cache
+            logger.info("Validation rules changed since the last run, ignoring cached results")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable validation cache {CACHE_PATH}: {e}")
+        
+        return {'rules': VALIDATION_RULES, 'papers': {}, 'hashes': {}}
+    
+    def _save_cache(self):
+        """Save validation results and content hashes for the next run."""
+        try:
+            with open(CACHE_PATH, 'wb') as f:
+                pickle.dump(self.cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Could not save validation cache {CACHE_PATH}: {e}")
     
-    def validate_single_paper(self, arxiv_id: str) -> Dict[str, bool]:
+    def _paper_stamp(self, arxiv_id: str) -> Tuple:
+        """Stamp of every file a paper's validation depends on."""
+        return (
+            arxiv_id in self.pdf_index,
+            self.text_stats.get(arxiv_id),
+            self.metadata_stats.get(arxiv_id),
+            self.parsed_stats.get(arxiv_id)
+        )
+    
+    def validate_single_paper(self, arxiv_id: str) -> Tuple[Dict[str, bool], Dict]:
         """
         Validate a single paper's files.
         
@@ -56,7 +146,8 @@ class DataValidator:
             arxiv_id: ArXiv paper ID
             
         Returns:
-            Dictionary of validation results
+            Tuple of (validation results, paper metadata merged with its parse
+            results, or an empty dict if the metadata could not be read)
         """
         results = {
             'has_pdf': False,
@@ -67,210 +158,294 @@ class DataValidator:
         }
         
         # Check PDF exists
-        pdf_path = None
-        for category_dir in PDF_BASE.iterdir():
-            if category_dir.is_dir():
-                potential_pdf = category_dir / f"{arxiv_id}.pdf"
-                if potential_pdf.exists():
-                    results['has_pdf'] = True
-                    pdf_path = potential_pdf
-                    break
+        pdf_path = self.pdf_index.get(arxiv_id)
+        results['has_pdf'] = pdf_path is not None
         
         # Check text file
         text_path = TEXT_DIR / f"{arxiv_id}.txt"
-        if text_path.exists():
+        if arxiv_id in self.text_stats:
             results['has_text'] = True
             
-            # Validate text length
-            with open(text_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-                if len(text) >= 1000:  # Minimum 1000 characters
+            # Validate text length. UTF-8 uses at most 4 bytes per character,
+            # so the file size alone settles it for all but very short texts.
+            if self.text_stats[arxiv_id][0] >= 4 * MIN_TEXT_LENGTH:
+                results['text_length_ok'] = True
+            else:
+                with open(text_path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                if len(text) >= MIN_TEXT_LENGTH:
                     results['text_length_ok'] = True
                 else:
                     self.issues.append(f"{arxiv_id}: Text too short ({len(text)} chars)")
         
         # Check metadata
+        metadata = {}
         metadata_path = METADATA_DIR / f"{arxiv_id}.json"
-        if metadata_path.exists():
+        if arxiv_id in self.metadata_stats:
             results['has_metadata'] = True
             
             try:
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
+                metadata = orjson.loads(metadata_path.read_bytes())
                 
                 # Check required fields
-                required_fields = ['arxiv_id', 'title', 'authors', 'abstract', 'primary_category']
-                if all(field in metadata for field in required_fields):
+                if all(field in metadata for field in REQUIRED_METADATA_FIELDS):
                     results['metadata_complete'] = True
                 else:
-                    missing = [f for f in required_fields if f not in metadata]
+                    missing = [f for f in REQUIRED_METADATA_FIELDS if f not in metadata]
                     self.issues.append(f"{arxiv_id}: Missing metadata fields: {missing}")
+                
+                # Merge in parse results (page count, text length, file size)
+                parsed_path = PARSED_DIR / f"{arxiv_id}.json"
+                if arxiv_id in self.parsed_stats:
+                    metadata.update(orjson.loads(parsed_path.read_bytes()))
             
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 self.issues.append(f"{arxiv_id}: Corrupted metadata JSON")
         
-        return results
+        return results, metadata
+    
+    def _validate_isolated(self, arxiv_id: str) -> Tuple[Dict[str, bool], Dict, List[str]]:
+        """Validate a single paper, returning the issues it raised instead of recording them."""
+        recorded_issues, self.issues = self.issues, []
+        try:
+            results, metadata = self.validate_single_paper(arxiv_id)
+            return results, metadata, self.issues
+        finally:
+            self.issues = recorded_issues
     
     def check_duplicates(self):
         """Check for duplicate papers based on content hash."""
         logger.info("Checking for duplicates...")
         
-        text_files = list(TEXT_DIR.glob("*.txt"))
+        # Files of different sizes cannot be duplicates, so only files that
+        # share their size with another file need hashing
+        ids_by_size = defaultdict(list)
+        for arxiv_id, (size, _mtime) in self.text_stats.items():
+            ids_by_size[size].append(arxiv_id)
         
-        for text_file in text_files:
-            try:
-                with open(text_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Create hash of content
-                content_hash = hashlib.md5(content.encode()).hexdigest()
-                
-                if content_hash in self.paper_hashes:
-                    self.stats['duplicates'] += 1
-                    self.issues.append(
-                        f"Duplicate found: {text_file.stem} matches {self.paper_hashes[content_hash]}"
-                    )
-                else:
-                    self.paper_hashes[content_hash] = text_file.stem
+        hashes = {}
+        
+        # One read buffer shared by every file hashed below
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        
+        for arxiv_ids in ids_by_size.values():
+            if len(arxiv_ids) < 2:
+                continue
             
-            except Exception as e:
-                logger.error(f"Error checking {text_file}: {e}")
+            for arxiv_id in sorted(arxiv_ids):
+                text_file = TEXT_DIR / f"{arxiv_id}.txt"
+                try:
+                    # Reuse last run's hash if the file is unchanged
+                    text_stat = self.text_stats[arxiv_id]
+                    cached = self.cache['hashes'].get(arxiv_id)
+                    if cached is not None and cached[0] == text_stat:
+                        content_hash = cached[1]
+                    else:
+                        # Hash the raw file bytes (SHA-256 is hardware accelerated, MD5 is not)
+                        hasher = hashlib.sha256()
+                        with open(text_file, 'rb') as f:
+                            while n := f.readinto(buffer):
+                                hasher.update(view[:n])
+                        content_hash = hasher.hexdigest()
+                    hashes[arxiv_id] = (text_stat, content_hash)
+                    
+                    if content_hash in self.paper_hashes:
+                        self.stats['duplicates'] += 1
+                        self.issues.append(
+                            f"Duplicate found: {arxiv_id} matches {self.paper_hashes[content_hash]}"
+                        )
+                    else:
+                        self.paper_hashes[content_hash] = arxiv_id
+                
+                except Exception as e:
+                    logger.error(f"Error checking {text_file}: {e}")
+        
+        self.cache['hashes'] = hashes
     
-    def gather_statistics(self):
-        """Gather comprehensive statistics about the collection."""
-        logger.info("Gathering statistics...")
+    def _record_results(self, arxiv_id: str, results: Dict[str, bool], metadata: Dict):
+        """Fold a single paper's validation results and metadata into the stats."""
+        if results['has_pdf']:
+            self.stats['valid_pdfs'] += 1
+        if results['has_text'] and results['text_length_ok']:
+            self.stats['valid_texts'] += 1
+        if results['has_metadata'] and results['metadata_complete']:
+            self.stats['valid_metadata'] += 1
         
-        metadata_files = list(METADATA_DIR.glob("*.json"))
-        self.stats['total_papers'] = len(metadata_files)
+        # Check if paper is complete
+        if not all(results.values()):
+            issues = [k for k, v in results.items() if not v]
+            self.issues.append(f"{arxiv_id}: Incomplete - {', '.join(issues)}")
         
-        total_text_length = 0
-        total_file_size = 0
+        if not metadata:
+            return
         
-        for metadata_file in metadata_files:
-            try:
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
-                
-                # Category distribution
-                category = metadata.get('primary_category', 'unknown')
-                self.stats['by_category'][category] = self.stats['by_category'].get(category, 0) + 1
-                
-                # Year distribution
-                published = metadata.get('published', '')
-                year = published.split('-')[0] if published else 'unknown'
-                self.stats['by_year'][year] = self.stats['by_year'].get(year, 0) + 1
-                
-                # Text length
-                if 'text_length' in metadata:
-                    total_text_length += metadata['text_length']
-                
-                # File size
-                if 'file_size_bytes' in metadata:
-                    total_file_size += metadata['file_size_bytes']
-            
-            except Exception as e:
-                logger.error(f"Error reading {metadata_file}: {e}")
+        # Category distribution
+        category = metadata.get('primary_category', 'unknown')
+        self.stats['by_category'][category] = self.stats['by_category'].get(category, 0) + 1
         
-        # Calculate averages
-        if self.stats['total_papers'] > 0:
-            self.stats['avg_paper_length'] = total_text_length // self.stats['total_papers']
-            self.stats['avg_file_size_mb'] = (total_file_size / self.stats['total_papers']) / (1024 * 1024)
-            self.stats['total_size_gb'] = total_file_size / (1024 * 1024 * 1024)
+        # Year distribution
+        published = metadata.get('published', '')
+        year = published.split('-')[0] if published else 'unknown'
+        self.stats['by_year'][year] = self.stats['by_year'].get(year, 0) + 1
+        
+        # Text length
+        if 'text_length' in metadata:
+            self.total_text_length += metadata['text_length']
+        
+        # File size
+        if 'file_size_bytes' in metadata:
+            self.total_file_size += metadata['file_size_bytes']
     
-    def validate_all(self):
+    def validate_all(self, parallel: bool = True):
         """Run comprehensive validation."""
         logger.info("="*80)
         logger.info("Starting Data Validation")
         logger.info("="*80)
         
-        # Get all metadata files
-        metadata_files = list(METADATA_DIR.glob("*.json"))
-        logger.info(f"Found {len(metadata_files)} papers to validate")
+        # Every paper has a metadata file
+        arxiv_ids = sorted(self.metadata_stats)
+        logger.info(f"Found {len(arxiv_ids)} papers to validate")
+        
+        self.stats['total_papers'] = len(arxiv_ids)
+        
+        # Only validate papers whose files changed since the last run
+        stamps = {arxiv_id: self._paper_stamp(arxiv_id) for arxiv_id in arxiv_ids}
+        cached_papers = self.cache['papers']
+        outcomes = {
+            arxiv_id: cached_papers[arxiv_id][1]
+            for arxiv_id in arxiv_ids
+            if arxiv_id in cached_papers and cached_papers[arxiv_id][0] == stamps[arxiv_id]
+        }
+        to_validate = [arxiv_id for arxiv_id in arxiv_ids if arxiv_id not in outcomes]
+        logger.info(f"Reusing cached results for {len(outcomes)} unchanged papers")
         
         # Validate each paper
-        for metadata_file in metadata_files:
-            arxiv_id = metadata_file.stem
-            results = self.validate_single_paper(arxiv_id)
-            
-            if results['has_pdf']:
-                self.stats['valid_pdfs'] += 1
-            if results['has_text'] and results['text_length_ok']:
-                self.stats['valid_texts'] += 1
-            if results['has_metadata'] and results['metadata_complete']:
-                self.stats['valid_metadata'] += 1
+        if parallel and len(to_validate) > 10:
+            # Parallel processing
+            num_workers = min(cpu_count(), 8)
+            logger.info(f"Using {num_workers} parallel workers")
             
-            # Check if paper is complete
-            if not all(results.values()):
-                issues = [k for k, v in results.items() if not v]
-                self.issues.append(f"{arxiv_id}: Incomplete - {', '.join(issues)}")
+            # Workers get a copy of the validator; leave the previous run's
+            # cache behind so it is not shipped to every worker
+            cache, self.cache = self.cache, None
+            try:
+                with Pool(num_workers, initializer=_init_worker, initargs=(self,)) as pool:
+                    for arxiv_id, outcome in pool.imap(_validate_paper, to_validate, chunksize=16):
+                        outcomes[arxiv_id] = outcome
+            finally:
+                self.cache = cache
+        else:
+            # Sequential processing
+            for arxiv_id in to_validate:
+                outcomes[arxiv_id] = self._validate_isolated(arxiv_id)
+        
+        for arxiv_id in arxiv_ids:
+            results, metadata, issues = outcomes[arxiv_id]
+            self.issues.extend(issues)
+            self._record_results(arxiv_id, results, metadata)
+        
+        self.cache['papers'] = {
+            arxiv_id: (stamps[arxiv_id], outcomes[arxiv_id]) for arxiv_id in arxiv_ids
+        }
+        
+        # Calculate averages
+        if self.stats['total_papers'] > 0:
+            self.stats['avg_paper_length'] = self.total_text_length // self.stats['total_papers']
+            self.stats['avg_file_size_mb'] = (self.total_file_size / self.stats['total_papers']) / (1024 * 1024)
+            self.stats['total_size_gb'] = self.total_file_size / (1024 * 1024 * 1024)
         
         # Check for duplicates
         self.check_duplicates()
         
-        # Gather statistics
-        self.gather_statistics()
+        self._save_cache()
         
         # Print results
         self._print_report()
     
     def _print_report(self):
         """Print validation report."""
-        logger.info("\n" + "="*80)
-        logger.info("VALIDATION REPORT")
-        logger.info("="*80)
-        
-        logger.info(f"\n📊 Overall Statistics:")
-        logger.info(f"  Total papers: {self.stats['total_papers']}")
-        logger.info(f"  Valid PDFs: {self.stats['valid_pdfs']}")
-        logger.info(f"  Valid texts: {self.stats['valid_texts']}")
-        logger.info(f"  Valid metadata: {self.stats['valid_metadata']}")
-        
-        logger.info(f"\n✅ Quality Metrics:")
+        # Build the whole report first and log it once, rather than dispatching
+        # every line through both handlers
+        lines = [
+            "",
+            "="*80,
+            "VALIDATION REPORT",
+            "="*80,
+            "",
+            "📊 Overall Statistics:",
+            f"  Total papers: {self.stats['total_papers']}",
+            f"  Valid PDFs: {self.stats['valid_pdfs']}",
+            f"  Valid texts: {self.stats['valid_texts']}",
+            f"  Valid metadata: {self.stats['valid_metadata']}",
+            "",
+            "✅ Quality Metrics:",
+        ]
         if self.stats['total_papers'] > 0:
             completeness = (self.stats['valid_texts'] / self.stats['total_papers']) * 100
-            logger.info(f"  Completeness rate: {completeness:.1f}%")
-        logger.info(f"  Duplicates found: {self.stats['duplicates']}")
-        logger.info(f"  Average paper length: {self.stats['avg_paper_length']:,} characters")
-        logger.info(f"  Average file size: {self.stats['avg_file_size_mb']:.2f} MB")
-        logger.info(f"  Total collection size: {self.stats['total_size_gb']:.2f} GB")
+            lines.append(f"  Completeness rate: {completeness:.1f}%")
+        lines.extend([
+            f"  Duplicates found: {self.stats['duplicates']}",
+            f"  Average paper length: {self.stats['avg_paper_length']:,} characters",
+            f"  Average file size: {self.stats['avg_file_size_mb']:.2f} MB",
+            f"  Total collection size: {self.stats['total_size_gb']:.2f} GB",
+        ])
         
-        logger.info(f"\n📁 Category Distribution:")
-        for category, count in sorted(self.stats['by_category'].items()):
-            logger.info(f"  {category}: {count} papers")
+        lines.extend(["", "📁 Category Distribution:"])
+        lines.extend(f"  {category}: {count} papers"
+                     for category, count in sorted(self.stats['by_category'].items()))
         
-        logger.info(f"\n📅 Year Distribution:")
-        for year, count in sorted(self.stats['by_year'].items(), reverse=True):
-            logger.info(f"  {year}: {count} papers")
+        lines.extend(["", "📅 Year Distribution:"])
+        lines.extend(f"  {year}: {count} papers"
+                     for year, count in sorted(self.stats['by_year'].items(), reverse=True))
         
         if self.issues:
-            logger.info(f"\n⚠️  Issues Found ({len(self.issues)}):")
-            for issue in self.issues[:10]:  # Show first 10 issues
-                logger.info(f"  - {issue}")
+            lines.extend(["", f"⚠️  Issues Found ({len(self.issues)}):"])
+            lines.extend(f"  - {issue}" for issue in self.issues[:10])  # Show first 10 issues
             if len(self.issues) > 10:
-                logger.info(f"  ... and {len(self.issues) - 10} more")
+                lines.append(f"  ... and {len(self.issues) - 10} more")
         else:
-            logger.info("\n✅ No issues found!")
+            lines.extend(["", "✅ No issues found!"])
         
-        logger.info("="*80)
+        lines.append("="*80)
+        logger.info("\n".join(lines))
         
         # Save report
         report_path = Path("logs/validation_report.json")
-        with open(report_path, 'w') as f:
-            json.dump({
-                'stats': self.stats,
-                'issues': self.issues
-            }, f, indent=2)
+        report_path.write_bytes(orjson.dumps({
+            'stats': self.stats,
+            'issues': self.issues
+        }, option=orjson.OPT_INDENT_2))
         
         logger.info(f"\nDetailed report saved to: {report_path}")
 
 
+# Validator owned by each worker process, set once by _init_worker
+_worker_validator = None
+
+
+def _init_worker(validator: DataValidator):
+    """Keep a copy of the driver's validator, with its directory indexes, in this worker."""
+    global _worker_validator
+    # Spawned workers do not inherit the parent's logging setup
+    if not logging.getLogger().handlers:
+        _configure_logging()
+    _worker_validator = validator
+
+
+def _validate_paper(arxiv_id: str) -> Tuple[str, Tuple[Dict[str, bool], Dict, List[str]]]:
+    """Validate a single paper in a worker and return its results, metadata and issues."""
+    return arxiv_id, _worker_validator._validate_isolated(arxiv_id)
+
+
 def main():
     """Main entry point."""
     validator = DataValidator()
-    validator.validate_all()
+    validator.validate_all(parallel=True)
     
     logger.info("\n✅ Validation complete! Check logs/validation_report.json for details.")
 
 
 if __name__ == "__main__":
+    _configure_logging()
     main()
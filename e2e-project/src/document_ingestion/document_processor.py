@@ -1,16 +1,18 @@
 import os
 import hashlib
-from typing import List, Union
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
 from pathlib import Path
-from langchain_community.document_loaders import (
-    WebBaseLoader,
-    PyPDFLoader,
-    TextLoader,
-    PyPDFDirectoryLoader
-)
+import requests
+from langchain_community.document_loaders.web_base import default_header_template
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
+# Upper bound on sources fetched at once
+MAX_LOAD_WORKERS = 32
+
 class DocumentProcessor:
     """Handles document loading, caching, and processing"""
     
@@ -24,21 +26,45 @@ class DocumentProcessor:
             chunk_overlap=chunk_overlap
         )
 
+        # requests.Session is not thread-safe, so each loader thread gets its own
+        self._http_local = threading.local()
+
+    def _get_http_session(self) -> requests.Session:
+        """Return this thread's HTTP session, set up with WebBaseLoader's default headers"""
+        session = getattr(self._http_local, "session", None)
+        if session is None:
+            session = requests.Session()
+            headers = default_header_template.copy()
+            if not headers.get("User-Agent"):
+                try:
+                    from fake_useragent import UserAgent
+                    headers["User-Agent"] = UserAgent().random
+                except ImportError:
+                    pass
+            session.headers = dict(headers)
+            self._http_local.session = session
+        return session
+
     # -------------------- Loaders --------------------
+    # Loaders are imported on first use so URL-only callers never import pypdf
     def load_from_url(self, url: str) -> List[Document]:
         """Load document(s) from a URL"""
-        loader = WebBaseLoader(url)
+        from langchain_community.document_loaders import WebBaseLoader
+        loader = WebBaseLoader(url, session=self._get_http_session())
         return loader.load()
 
     def load_from_pdf_dir(self, directory: Union[str, Path]) -> List[Document]:
+        from langchain_community.document_loaders import PyPDFDirectoryLoader
         loader = PyPDFDirectoryLoader(str(directory))
         return loader.load()
 
     def load_from_txt(self, file_path: Union[str, Path]) -> List[Document]:
+        from langchain_community.document_loaders import TextLoader
         loader = TextLoader(str(file_path), encoding="utf-8")
         return loader.load()
 
     def load_from_pdf(self, file_path: Union[str, Path]) -> List[Document]:
+        from langchain_community.document_loaders import PyPDFLoader
         loader = PyPDFLoader(str(file_path))
         return loader.load()
 
@@ -46,49 +72,80 @@ class DocumentProcessor:
     def _get_cache_path(self, source: str) -> Path:
         """
         Generate a deterministic filename from URL or file path.
+        Uses a 128-bit BLAKE2b digest, which is faster than MD5 and long
+        enough that distinct sources never share a cache file in practice.
         """
-        hash_name = hashlib.md5(source.encode("utf-8")).hexdigest()[:16]
-        return self.cache_dir / f"{hash_name}.txt"
-
-    def _save_to_cache(self, cache_path: Path, content: str):
-        cache_path.write_text(content, encoding="utf-8")
-
-    def _load_from_cache(self, cache_path: Path) -> Union[str, None]:
+        hash_name = hashlib.blake2b(source.encode("utf-8"), digest_size=16).hexdigest()
+        return self.cache_dir / f"{hash_name}.pkl"
+
+    def _save_to_cache(self, cache_path: Path, docs: List[Document]):
+        """Pickle the loaded Documents so a cache hit skips parsing and keeps per-page metadata"""
+        # Write to a private temp file and rename it into place, so readers
+        # never see a partially written pickle
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_bytes(pickle.dumps(docs, protocol=5))
+            os.replace(tmp_path, cache_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _load_from_cache(self, cache_path: Path, source: str) -> Optional[List[Document]]:
         if cache_path.exists():
-            return cache_path.read_text(encoding="utf-8")
+            try:
+                return pickle.loads(cache_path.read_bytes())
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+                # Truncated or written by an incompatible langchain; reload the source
+                return None
+
+        # Older caches stored only the concatenated text
+        legacy_path = cache_path.with_suffix(".txt")
+        if legacy_path.exists():
+            content = legacy_path.read_text(encoding="utf-8")
+            if content:
+                return [Document(page_content=content, metadata={"source": str(source), "cached": True})]
         return None
 
+    def _load_one(self, src: str) -> List[Document]:
+        """Load a single URL, PDF, or TXT source with caching"""
+        cache_path = self._get_cache_path(src)
+
+        # Check cache first
+        cached_docs = self._load_from_cache(cache_path, src)
+        if cached_docs:
+            return cached_docs
+
+        # Load new document
+        if src.startswith(("http://", "https://")):
+            loaded_docs = self.load_from_url(src)
+        else:
+            path = Path(src)
+            if path.is_dir():
+                loaded_docs = self.load_from_pdf_dir(path)
+            elif path.suffix.lower() == ".txt":
+                loaded_docs = self.load_from_txt(path)
+            elif path.suffix.lower() == ".pdf":
+                loaded_docs = self.load_from_pdf(path)
+            else:
+                raise ValueError(f"Unsupported source type: {src}")
+
+        self._save_to_cache(cache_path, loaded_docs)
+        return loaded_docs
+
     def load_documents(self, sources: List[str]) -> List[Document]:
-        """Load from URL, PDF, or TXT with caching"""
+        """Load from URL, PDF, or TXT with caching, fetching sources concurrently"""
         docs: List[Document] = []
+        if not sources:
+            return docs
 
-        for src in sources:
-            cache_path = self._get_cache_path(src)
+        # Load each distinct source once, so no two threads share a cache file
+        unique_sources = list(dict.fromkeys(sources))
 
-            # Check cache first
-            cached_content = self._load_from_cache(cache_path)
-            if cached_content:
-                docs.append(Document(page_content=cached_content, metadata={"source": str(src), "cached": True}))
-                continue
+        # Loading is network/disk bound, so threads overlap the waits
+        with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(unique_sources))) as executor:
+            loaded = dict(zip(unique_sources, executor.map(self._load_one, unique_sources)))
 
-            # Load new document
-            if src.startswith(("http://", "https://")):
-                loaded_docs = self.load_from_url(src)
-            else:
-                path = Path(src)
-                if path.is_dir():
-                    loaded_docs = self.load_from_pdf_dir(path)
-                elif path.suffix.lower() == ".txt":
-                    loaded_docs = self.load_from_txt(path)
-                elif path.suffix.lower() == ".pdf":
-                    loaded_docs = self.load_from_pdf(path)
-                else:
-                    raise ValueError(f"Unsupported source type: {src}")
-
-            # Combine and cache
-            combined_text = "\n\n".join([d.page_content for d in loaded_docs])
-            self._save_to_cache(cache_path, combined_text)
-            docs.extend(loaded_docs)
+        for src in sources:
+            docs.extend(loaded[src])
 
         return docs
 